@@ -1,5 +1,25 @@
 """eBay OAuth — Python client and CLI for eBay OAuth 2.0."""
 
-from .auth import EbayOAuthClient
+from typing import TYPE_CHECKING
 
-__all__ = ["EbayOAuthClient"]
+if TYPE_CHECKING:
+    from .auth import EbayOAuthClient
+    from .async_auth import AsyncEbayOAuthClient
+
+__all__ = ["EbayOAuthClient", "AsyncEbayOAuthClient"]
+
+
+def __getattr__(name: str):
+    # Import clients on first access so the CLI can start without loading httpx
+    if name == "EbayOAuthClient":
+        from .auth import EbayOAuthClient as value
+    elif name == "AsyncEbayOAuthClient":
+        from .async_auth import AsyncEbayOAuthClient as value
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,82 @@
+"""State and helpers shared by the sync and async OAuth clients."""
+
+import base64
+import time
+
+from .config import ENVIRONMENTS
+
+
+def build_basic_auth_header(client_id: str, client_secret: str) -> str:
+    """Build Basic auth header value: base64(client_id:client_secret)."""
+    credentials = f"{client_id}:{client_secret}".encode()
+    return "Basic " + base64.b64encode(credentials).decode("ascii")
+
+
+class OAuthClientBase:
+    """Token state and refresh request/response handling, independent of transport.
+
+    Subclasses own the HTTP client and the lock that serializes refreshes.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        refresh_token: str,
+        environment: str = "sandbox",
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.environment = environment
+
+        env_config = ENVIRONMENTS.get(environment)
+        if not env_config:
+            raise ValueError(f"Unknown environment: {environment}. Use 'sandbox' or 'production'.")
+        self.token_url = env_config["token_url"]
+        self.api_base = env_config["api_base"]
+        self._auth_header = build_basic_auth_header(client_id, client_secret)
+
+        self._access_token: str | None = None
+        self._token_expiry: float = 0
+
+    def _basic_auth_header(self) -> str:
+        """Return the Basic auth header value, computed once at construction."""
+        return self._auth_header
+
+    def _token_is_valid(self) -> bool:
+        """Check whether the cached token is still valid (with 60s buffer)."""
+        return bool(self._access_token) and time.monotonic() < (self._token_expiry - 60)
+
+    def _request_kwargs(self) -> dict:
+        """Headers and form body for a refresh_token grant request."""
+        return {
+            "headers": {
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Authorization": self._auth_header,
+            },
+            "data": {
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token,
+            },
+        }
+
+    def _accept_token(self, data: dict, now: float) -> str:
+        """Cache the access token from a token response.
+
+        Args:
+            data: Parsed JSON body of the token response.
+            now: time.monotonic() taken before the request was sent.
+
+        Raises:
+            RuntimeError: If the response doesn't contain an access token.
+        """
+        access_token = data.get("access_token")
+        if not access_token:
+            raise RuntimeError(f"No access_token in response: {data}")
+
+        self._access_token = access_token
+        expires_in = data.get("expires_in", 7200)
+        self._token_expiry = now + int(expires_in)
+
+        return access_token
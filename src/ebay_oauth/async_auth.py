@@ -0,0 +1,93 @@
+"""Async eBay OAuth client with automatic token refresh."""
+
+import asyncio
+import time
+
+import httpx
+
+from ._common import OAuthClientBase
+
+
+class AsyncEbayOAuthClient(OAuthClientBase):
+    """Async OAuth client that manages access token lifecycle.
+
+    Usage:
+        async with AsyncEbayOAuthClient(
+            client_id="...",
+            client_secret="...",
+            refresh_token="...",
+            environment="sandbox",
+        ) as client:
+            token = await client.get_access_token()  # auto-refreshes when expired
+
+    Concurrent tasks that find the token expired share a single refresh
+    request, and refreshes reuse one pooled httpx.AsyncClient.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        refresh_token: str,
+        environment: str = "sandbox",
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        super().__init__(client_id, client_secret, refresh_token, environment)
+        self._transport = transport
+        self._http: httpx.AsyncClient | None = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncEbayOAuthClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connection, if one was opened."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def get_access_token(self) -> str:
+        """Get a valid access token, refreshing if expired.
+
+        Returns:
+            A valid eBay access token string.
+
+        Raises:
+            httpx.HTTPStatusError: If the token refresh request fails.
+            RuntimeError: If the response doesn't contain an access token.
+        """
+        # Return cached token if still valid
+        if self._token_is_valid():
+            return self._access_token
+
+        async with self._refresh_lock:
+            # Another task may have refreshed while we waited for the lock
+            if self._token_is_valid():
+                return self._access_token
+            return await self._refresh_access_token()
+
+    async def _refresh_access_token(self) -> str:
+        """Exchange the refresh token for a new access token."""
+        # Measure expiry from before the request so round-trip time counts against it
+        now = time.monotonic()
+
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=8),
+                transport=self._transport,
+            )
+
+        response = await self._http.post(self.token_url, **self._request_kwargs())
+        response.raise_for_status()
+        return self._accept_token(response.json(), now)
+
+    async def force_refresh(self) -> str:
+        """Force a token refresh regardless of expiry."""
+        async with self._refresh_lock:
+            self._access_token = None
+            self._token_expiry = 0
+            return await self._refresh_access_token()
@@ -1,14 +1,15 @@
 """eBay OAuth client with automatic token refresh."""
 
-import base64
+import threading
 import time
 
 import httpx
 
-from .config import ENVIRONMENTS
+from ._common import OAuthClientBase
+from .token_storage import get_credentials, invalidate, update_access_token
 
 
-class EbayOAuthClient:
+class EbayOAuthClient(OAuthClientBase):
     """OAuth client that manages access token lifecycle.
 
     Usage:
@@ -19,6 +20,16 @@ class EbayOAuthClient:
             environment="sandbox",
         )
         token = client.get_access_token()  # auto-refreshes when expired
+
+    The underlying HTTP connection pool is reused across refreshes. Call
+    close() when done, or use the client as a context manager:
+
+        with EbayOAuthClient(...) as client:
+            token = client.get_access_token()
+
+    Pass persist=True to share access tokens with other processes through the
+    OS keychain entry written by `ebay-oauth setup`. Callers that have just read
+    that entry can pass it as stored_credentials to avoid a second read.
     """
 
     def __init__(
@@ -27,30 +38,60 @@ class EbayOAuthClient:
         client_secret: str,
         refresh_token: str,
         environment: str = "sandbox",
+        persist: bool = False,
+        transport: httpx.BaseTransport | None = None,
+        stored_credentials: dict | None = None,
     ):
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self.refresh_token = refresh_token
-        self.environment = environment
-
-        env_config = ENVIRONMENTS.get(environment)
-        if not env_config:
-            raise ValueError(f"Unknown environment: {environment}. Use 'sandbox' or 'production'.")
-        self.token_url = env_config["token_url"]
-        self.api_base = env_config["api_base"]
-
-        self._access_token: str | None = None
-        self._token_expiry: float = 0
-
-    def _basic_auth_header(self) -> str:
-        """Generate Basic auth header value: base64(client_id:client_secret)."""
-        credentials = f"{self.client_id}:{self.client_secret}"
-        encoded = base64.b64encode(credentials.encode()).decode()
-        return f"Basic {encoded}"
+        super().__init__(client_id, client_secret, refresh_token, environment)
+        self._transport = transport
+        self._http: httpx.Client | None = None
+        self._refresh_lock = threading.Lock()
+
+        self._persist = False
+        if persist:
+            self._load_persisted_token(stored_credentials)
+
+    def __enter__(self) -> "EbayOAuthClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the pooled HTTP connection, if one was opened."""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def _load_persisted_token(self, creds: dict | None = None) -> None:
+        """Adopt the access token cached in the keychain, if it belongs to us.
+
+        Args:
+            creds: Credentials the caller just read from the keychain. When
+                omitted the keychain is read directly, bypassing the in-process
+                cache so tokens written by other processes are seen.
+        """
+        if creds is None:
+            invalidate()
+            creds = get_credentials()
+        if not creds or creds.get("refresh_token") != self.refresh_token:
+            return
+        if creds.get("environment", self.environment) != self.environment:
+            return
+
+        self._persist = True
+        if creds.get("access_token") and creds.get("token_expiry"):
+            # The keychain stores wall-clock expiry; convert to a monotonic deadline
+            remaining = float(creds["token_expiry"]) - time.time()
+            self._access_token = creds["access_token"]
+            self._token_expiry = time.monotonic() + remaining
 
     def get_access_token(self) -> str:
         """Get a valid access token, refreshing if expired.
 
+        Safe to call from multiple threads: concurrent callers that find the
+        token expired share a single refresh request.
+
         Returns:
             A valid eBay access token string.
 
@@ -58,41 +99,41 @@ class EbayOAuthClient:
             httpx.HTTPStatusError: If the token refresh request fails.
             RuntimeError: If the response doesn't contain an access token.
         """
-        # Return cached token if still valid (with 60s buffer)
-        if self._access_token and time.time() < (self._token_expiry - 60):
+        # Return cached token if still valid
+        if self._token_is_valid():
             return self._access_token
 
-        return self._refresh_access_token()
+        with self._refresh_lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._token_is_valid():
+                return self._access_token
+            return self._refresh_access_token()
 
     def _refresh_access_token(self) -> str:
         """Exchange the refresh token for a new access token."""
-        with httpx.Client() as client:
-            response = client.post(
-                self.token_url,
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded",
-                    "Authorization": self._basic_auth_header(),
-                },
-                data={
-                    "grant_type": "refresh_token",
-                    "refresh_token": self.refresh_token,
-                },
+        # Measure expiry from before the request so round-trip time counts against it
+        now = time.monotonic()
+
+        if self._http is None:
+            self._http = httpx.Client(
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=4),
+                transport=self._transport,
             )
-            response.raise_for_status()
 
-        data = response.json()
-        access_token = data.get("access_token")
-        if not access_token:
-            raise RuntimeError(f"No access_token in response: {data}")
+        response = self._http.post(self.token_url, **self._request_kwargs())
+        response.raise_for_status()
+        access_token = self._accept_token(response.json(), now)
 
-        self._access_token = access_token
-        expires_in = data.get("expires_in", 7200)
-        self._token_expiry = time.time() + int(expires_in)
+        if self._persist:
+            wall_expiry = time.time() + (self._token_expiry - time.monotonic())
+            update_access_token(access_token, wall_expiry, self.refresh_token, self.environment)
 
         return access_token
 
     def force_refresh(self) -> str:
         """Force a token refresh regardless of expiry."""
-        self._access_token = None
-        self._token_expiry = 0
-        return self._refresh_access_token()
+        with self._refresh_lock:
+            self._access_token = None
+            self._token_expiry = 0
+            return self._refresh_access_token()
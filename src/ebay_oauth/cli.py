@@ -1,29 +1,45 @@
 """CLI for eBay OAuth setup and token management."""
 
-import base64
 import os
 import sys
 import webbrowser
-from urllib.parse import urlparse, parse_qs
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse, parse_qsl
 
 import click
-import httpx
 
 from .config import RELAY_URL, ENVIRONMENTS
-from .token_storage import store_credentials, get_credentials, delete_credentials
-from .auth import EbayOAuthClient
 
+# httpx, keyring and the client are imported inside the commands that need
+# them, keeping `ebay-oauth --help` startup fast.
+if TYPE_CHECKING:
+    import httpx
+
+
+def _exchange_code_for_tokens(
+    code: str,
+    environment: str,
+    client_id: str,
+    client_secret: str,
+    runame: str,
+    http: "httpx.Client | None" = None,
+) -> dict:
+    """Exchange an authorization code for access + refresh tokens.
+
+    Pass an existing httpx.Client as ``http`` to reuse its connection pool.
+    """
+    import httpx
+
+    from ._common import build_basic_auth_header
 
-def _exchange_code_for_tokens(code: str, environment: str, client_id: str, client_secret: str, runame: str) -> dict:
-    """Exchange an authorization code for access + refresh tokens."""
     env_config = ENVIRONMENTS[environment]
-    credentials = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
 
-    response = httpx.post(
+    post = http.post if http is not None else httpx.post
+    response = post(
         env_config["token_url"],
         headers={
             "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": f"Basic {credentials}",
+            "Authorization": build_basic_auth_header(client_id, client_secret),
         },
         data={
             "grant_type": "authorization_code",
@@ -47,6 +63,8 @@ def cli() -> None:
 @click.option("--relay-url", default=RELAY_URL, help="OAuth relay URL.")
 def setup(environment: str, relay_url: str) -> None:
     """Run the OAuth flow to get and store eBay tokens."""
+    from .token_storage import store_credentials
+
     client_id = os.environ.get("EBAY_CLIENT_ID")
     client_secret = os.environ.get("EBAY_CLIENT_SECRET")
     runame = os.environ.get("EBAY_RUNAME", "")
@@ -71,11 +89,12 @@ def setup(environment: str, relay_url: str) -> None:
 
     # Extract the authorization code from the URL
     parsed = urlparse(success_url)
-    params = parse_qs(parsed.query)
+    # First value wins for repeated keys, as with parse_qs(...)[0]
+    params = {k: v for k, v in reversed(parse_qsl(parsed.query))}
 
-    code = params.get("code", [None])[0]
+    code = params.get("code")
     if not code:
-        error = params.get("error", ["unknown"])[0]
+        error = params.get("error", "unknown")
         click.echo(f"\nOAuth failed: {error}", err=True)
         sys.exit(1)
 
@@ -105,6 +124,9 @@ def setup(environment: str, relay_url: str) -> None:
 @cli.command()
 def status() -> None:
     """Check if stored eBay credentials are valid."""
+    from .auth import EbayOAuthClient
+    from .token_storage import get_credentials
+
     creds = get_credentials()
     if not creds:
         click.echo("No credentials found in keychain.")
@@ -126,14 +148,16 @@ def status() -> None:
         return
 
     try:
-        client = EbayOAuthClient(
+        with EbayOAuthClient(
             client_id=client_id,
             client_secret=client_secret,
             refresh_token=refresh_token,
             environment=environment,
-        )
-        client.get_access_token()
-        click.echo("Access token: valid (refreshed successfully)")
+            persist=True,
+            stored_credentials=creds,
+        ) as client:
+            client.get_access_token()
+        click.echo("Access token: valid")
     except Exception as e:
         click.echo(f"Access token: refresh failed ({e})")
 
@@ -141,6 +165,9 @@ def status() -> None:
 @cli.command()
 def refresh() -> None:
     """Force-refresh the access token."""
+    from .auth import EbayOAuthClient
+    from .token_storage import get_credentials
+
     creds = get_credentials()
     if not creds:
         click.echo("No credentials found. Run 'ebay-oauth setup' first.", err=True)
@@ -156,13 +183,15 @@ def refresh() -> None:
         sys.exit(1)
 
     try:
-        client = EbayOAuthClient(
+        with EbayOAuthClient(
             client_id=client_id,
             client_secret=client_secret,
             refresh_token=refresh_token,
             environment=environment,
-        )
-        token = client.force_refresh()
+            persist=True,
+            stored_credentials=creds,
+        ) as client:
+            token = client.force_refresh()
         click.echo(f"Access token refreshed successfully.")
         click.echo(f"Token: {token[:20]}...")
     except Exception as e:
@@ -173,6 +202,8 @@ def refresh() -> None:
 @cli.command()
 def logout() -> None:
     """Delete stored credentials from the keychain."""
+    from .token_storage import delete_credentials
+
     if delete_credentials():
         click.echo("Credentials deleted from keychain.")
     else:
@@ -2,27 +2,16 @@
 
 import secrets
 import socket
+import sys
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
-from threading import Event
+from urllib.parse import urlparse, parse_qsl
+from threading import Event, Thread
+from time import monotonic
 from typing import Any
 
 from .config import CALLBACK_PORT_RANGE, CALLBACK_TIMEOUT_SECONDS
 
 
-def _find_available_port() -> int:
-    """Find an available port in the configured range."""
-    start, end = CALLBACK_PORT_RANGE
-    for port in range(start, end + 1):
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(("127.0.0.1", port))
-                return port
-        except OSError:
-            continue
-    raise RuntimeError(f"No available port in range {start}-{end}")
-
-
 def _generate_nonce() -> str:
     """Generate a cryptographic nonce for CSRF protection."""
     return secrets.token_urlsafe(32)
@@ -64,6 +53,9 @@ h1 { color: #cc0000; }
 <div class="details">%s</div>
 </div></body></html>"""
 
+SUCCESS_BODY = SUCCESS_HTML.encode("utf-8")
+ERROR_TEMPLATE = ERROR_HTML.encode("utf-8")
+
 
 class _CallbackHandler(BaseHTTPRequestHandler):
     """HTTP request handler for the OAuth callback."""
@@ -76,10 +68,11 @@ class _CallbackHandler(BaseHTTPRequestHandler):
             self.wfile.write(b"Not found")
             return
 
-        params = parse_qs(parsed.query)
+        # First value wins for repeated keys, as with parse_qs(...)[0]
+        params = {k: v for k, v in reversed(parse_qsl(parsed.query))}
 
         # Validate nonce
-        received_nonce = params.get("nonce", [None])[0]
+        received_nonce = params.get("nonce")
         if received_nonce != self.server.expected_nonce:
             self._send_error("Invalid security token (nonce mismatch)")
             self.server.callback_error = "Nonce mismatch"
@@ -87,17 +80,17 @@ class _CallbackHandler(BaseHTTPRequestHandler):
             return
 
         # Check for errors
-        error = params.get("error", [None])[0]
+        error = params.get("error")
         if error:
-            desc = params.get("error_description", [error])[0]
+            desc = params.get("error_description", error)
             self._send_error(desc)
             self.server.callback_error = desc
             self.server.callback_done.set()
             return
 
         # Extract tokens
-        access_token = params.get("access_token", [None])[0]
-        refresh_token = params.get("refresh_token", [None])[0]
+        access_token = params.get("access_token")
+        refresh_token = params.get("refresh_token")
 
         if not refresh_token:
             self._send_error("Missing refresh token in callback")
@@ -107,28 +100,61 @@ class _CallbackHandler(BaseHTTPRequestHandler):
 
         self.send_response(200)
         self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(SUCCESS_BODY)))
         self.end_headers()
-        self.wfile.write(SUCCESS_HTML.encode())
+        self.wfile.write(SUCCESS_BODY)
 
         self.server.callback_result = {
             "access_token": access_token,
             "refresh_token": refresh_token,
-            "expires_in": params.get("expires_in", [None])[0],
-            "refresh_token_expires_in": params.get("refresh_token_expires_in", [None])[0],
+            "expires_in": params.get("expires_in"),
+            "refresh_token_expires_in": params.get("refresh_token_expires_in"),
         }
         self.server.callback_done.set()
 
     def _send_error(self, message: str) -> None:
+        body = ERROR_TEMPLATE % message.encode("utf-8")
         self.send_response(400)
         self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write((ERROR_HTML % message).encode())
+        self.wfile.write(body)
 
     def log_message(self, format: str, *args: Any) -> None:
         # Suppress default logging
         pass
 
 
+class _CallbackServer(HTTPServer):
+    """HTTPServer that refuses to share its port on Windows.
+
+    On Windows SO_REUSEADDR lets a bind succeed on a port that another socket
+    is already listening on, so bind exclusively there instead.
+    """
+
+    allow_reuse_address = sys.platform != "win32"
+
+    def server_bind(self) -> None:
+        if sys.platform == "win32":
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        super().server_bind()
+
+
+def _bind_available_port() -> HTTPServer:
+    """Bind the callback server to the first free port in the configured range.
+
+    The server itself is bound on each attempt, so the port cannot be taken by
+    another process between probing and serving.
+    """
+    start, end = CALLBACK_PORT_RANGE
+    for port in range(start, end + 1):
+        try:
+            return _CallbackServer(("127.0.0.1", port), _CallbackHandler)
+        except OSError:
+            continue
+    raise RuntimeError(f"No available port in range {start}-{end}")
+
+
 def start_callback_server() -> tuple[int, str, "HTTPServer"]:
     """Start the local callback server.
 
@@ -136,10 +162,10 @@ def start_callback_server() -> tuple[int, str, "HTTPServer"]:
         (port, nonce, server) tuple. Call wait_for_callback(server) to block
         until the callback is received.
     """
-    port = _find_available_port()
+    server = _bind_available_port()
+    port = server.server_address[1]
     nonce = _generate_nonce()
 
-    server = HTTPServer(("127.0.0.1", port), _CallbackHandler)
     server.expected_nonce = nonce  # type: ignore[attr-defined]
     server.callback_result = None  # type: ignore[attr-defined]
     server.callback_error = None  # type: ignore[attr-defined]
@@ -148,6 +174,21 @@ def start_callback_server() -> tuple[int, str, "HTTPServer"]:
     return port, nonce, server
 
 
+def _serve_until_callback(server: HTTPServer, deadline: float) -> None:
+    """Handle requests until the callback arrives or the deadline passes.
+
+    Each handle_request() blocks in select() until a request arrives or the
+    remaining time runs out, so there are no idle wakeups, and the loop stops
+    as soon as the callback has been handled.
+    """
+    while not server.callback_done.is_set():
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return
+        server.timeout = remaining
+        server.handle_request()
+
+
 def wait_for_callback(server: HTTPServer, timeout: int = CALLBACK_TIMEOUT_SECONDS) -> dict:
     """Block until the OAuth callback is received or timeout.
 
@@ -162,19 +203,20 @@ def wait_for_callback(server: HTTPServer, timeout: int = CALLBACK_TIMEOUT_SECOND
         TimeoutError: If callback not received within timeout
         RuntimeError: If callback contained an error
     """
-    server.timeout = 1  # handle_request timeout for polling
-
-    import time
-    deadline = time.monotonic() + timeout
+    deadline = monotonic() + timeout
+    thread = Thread(target=_serve_until_callback, args=(server, deadline), daemon=True)
+    thread.start()
 
     try:
-        while not server.callback_done.is_set():
-            if time.monotonic() > deadline:
-                raise TimeoutError("OAuth callback not received within timeout")
-            server.handle_request()
+        received = server.callback_done.wait(timeout)
+        # The serve thread exits right after the callback or at the deadline
+        thread.join(1)
     finally:
         server.server_close()
 
+    if not received:
+        raise TimeoutError("OAuth callback not received within timeout")
+
     if server.callback_error:
         raise RuntimeError(f"OAuth error: {server.callback_error}")
 
@@ -1,24 +1,81 @@
 """OS keychain storage for eBay OAuth credentials via keyring."""
 
+import functools
 import json
+import threading
+
 import keyring
 from .config import KEYRING_SERVICE, KEYRING_ACCOUNT
 
+_update_lock = threading.Lock()
+
 
 def store_credentials(credentials: dict) -> None:
     """Store OAuth credentials in the OS keychain."""
     keyring.set_password(KEYRING_SERVICE, KEYRING_ACCOUNT, json.dumps(credentials))
+    invalidate()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_credentials_cached() -> str | None:
+    """Read the raw credentials blob, caching it for the life of the process."""
+    return keyring.get_password(KEYRING_SERVICE, KEYRING_ACCOUNT)
+
+
+def invalidate() -> None:
+    """Drop the cached keychain read so the next lookup hits the keychain."""
+    _get_credentials_cached.cache_clear()
 
 
 def get_credentials() -> dict | None:
     """Retrieve OAuth credentials from the OS keychain."""
     try:
-        data = keyring.get_password(KEYRING_SERVICE, KEYRING_ACCOUNT)
+        data = _get_credentials_cached()
         return json.loads(data) if data else None
     except Exception:
         return None
 
 
+def update_access_token(
+    access_token: str,
+    expiry: float,
+    refresh_token: str,
+    environment: str | None = None,
+) -> bool:
+    """Merge a refreshed access token into the stored credentials.
+
+    The merge only happens if the stored entry still belongs to the refresh
+    token (and environment, if given) the access token was minted from, so a
+    concurrent `ebay-oauth setup` or logout is never overwritten with a stale
+    token.
+
+    Args:
+        access_token: The new access token.
+        expiry: Wall-clock (epoch seconds) time at which the token expires.
+        refresh_token: The refresh token the access token was minted from.
+        environment: The environment the access token belongs to.
+
+    Returns:
+        True if the token was written, False if no matching credentials are
+        stored or the keychain write failed.
+    """
+    with _update_lock:
+        # Merge onto the current keychain contents, not a possibly stale cache
+        invalidate()
+        credentials = get_credentials()
+        if not credentials or credentials.get("refresh_token") != refresh_token:
+            return False
+        if environment and credentials.get("environment", environment) != environment:
+            return False
+        credentials["access_token"] = access_token
+        credentials["token_expiry"] = expiry
+        try:
+            store_credentials(credentials)
+            return True
+        except Exception:
+            return False
+
+
 def delete_credentials() -> bool:
     """Delete OAuth credentials from the OS keychain."""
     try:
@@ -26,6 +83,8 @@ def delete_credentials() -> bool:
         return True
     except Exception:
         return False
+    finally:
+        invalidate()
 
 
 def has_credentials() -> bool:
@@ -1,21 +1,55 @@
 """Tests for EbayOAuthClient token refresh."""
 
+import json
 import time
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+from urllib.parse import parse_qs
 
 import pytest
 import httpx
 
 from ebay_oauth.auth import EbayOAuthClient
+from ebay_oauth import token_storage
+
+
+def _token_transport(payload: dict, requests: list, delay: float = 0) -> httpx.MockTransport:
+    """Mock token endpoint that records each request and returns payload."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if delay:
+            time.sleep(delay)
+        return httpx.Response(200, json=payload)
+    return httpx.MockTransport(handler)
+
+
+@pytest.fixture(autouse=True)
+def _clear_credentials_cache():
+    token_storage.invalidate()
+    yield
+    token_storage.invalidate()
+
+
+@pytest.fixture
+def token_requests():
+    return []
+
+
+@pytest.fixture
+def mock_transport(token_requests):
+    return _token_transport(
+        {"access_token": "new_access_token", "expires_in": 7200},
+        token_requests,
+    )
 
 
 @pytest.fixture
-def client():
+def client(mock_transport):
     return EbayOAuthClient(
         client_id="test_client_id",
         client_secret="test_client_secret",
         refresh_token="test_refresh_token",
         environment="sandbox",
+        transport=mock_transport,
     )
 
 
@@ -52,101 +86,244 @@ class TestEbayOAuthClient:
         decoded = base64.b64decode(header.split(" ")[1]).decode()
         assert decoded == "test_client_id:test_client_secret"
 
-    @patch("ebay_oauth.auth.httpx.Client")
-    def test_get_access_token_refreshes(self, mock_client_cls, client):
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "access_token": "new_access_token",
-            "expires_in": 7200,
-            "token_type": "User Access Token",
-        }
-        mock_response.raise_for_status = MagicMock()
-
-        mock_http = MagicMock()
-        mock_http.post.return_value = mock_response
-        mock_http.__enter__ = MagicMock(return_value=mock_http)
-        mock_http.__exit__ = MagicMock(return_value=False)
-        mock_client_cls.return_value = mock_http
-
+    def test_get_access_token_refreshes(self, client, token_requests):
         token = client.get_access_token()
         assert token == "new_access_token"
         assert client._access_token == "new_access_token"
 
-        # Verify the POST was called with correct params
-        mock_http.post.assert_called_once()
-        call_kwargs = mock_http.post.call_args
-        assert "refresh_token" in call_kwargs.kwargs.get("data", {}).get("grant_type", "")
-        assert call_kwargs.kwargs["headers"]["Authorization"].startswith("Basic ")
+        # Verify the POST was sent with correct params
+        assert len(token_requests) == 1
+        request = token_requests[0]
+        assert request.method == "POST"
+        assert str(request.url) == client.token_url
+        assert request.headers["Authorization"] == client._basic_auth_header()
+        form = parse_qs(request.content.decode())
+        assert form == {"grant_type": ["refresh_token"], "refresh_token": ["test_refresh_token"]}
 
-    @patch("ebay_oauth.auth.httpx.Client")
-    def test_get_access_token_uses_cache(self, mock_client_cls, client):
+    def test_get_access_token_uses_cache(self, client, token_requests):
         # Set a cached token that hasn't expired
         client._access_token = "cached_token"
-        client._token_expiry = time.time() + 3600
+        client._token_expiry = time.monotonic() + 3600
 
-        token = client.get_access_token()
-        assert token == "cached_token"
-        mock_client_cls.assert_not_called()
+        assert client.get_access_token() == "cached_token"
+        assert token_requests == []
 
-    @patch("ebay_oauth.auth.httpx.Client")
-    def test_get_access_token_refreshes_when_expired(self, mock_client_cls, client):
+    def test_get_access_token_refreshes_when_expired(self, client, token_requests):
         # Set an expired cached token
         client._access_token = "old_token"
-        client._token_expiry = time.time() - 100
-
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "access_token": "refreshed_token",
-            "expires_in": 7200,
-        }
-        mock_response.raise_for_status = MagicMock()
+        client._token_expiry = time.monotonic() - 100
 
-        mock_http = MagicMock()
-        mock_http.post.return_value = mock_response
-        mock_http.__enter__ = MagicMock(return_value=mock_http)
-        mock_http.__exit__ = MagicMock(return_value=False)
-        mock_client_cls.return_value = mock_http
+        assert client.get_access_token() == "new_access_token"
+        assert len(token_requests) == 1
 
-        token = client.get_access_token()
-        assert token == "refreshed_token"
-
-    @patch("ebay_oauth.auth.httpx.Client")
-    def test_force_refresh(self, mock_client_cls, client):
+    def test_force_refresh(self, client, token_requests):
         client._access_token = "cached"
-        client._token_expiry = time.time() + 9999
+        client._token_expiry = time.monotonic() + 9999
 
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            "access_token": "forced_token",
-            "expires_in": 7200,
-        }
-        mock_response.raise_for_status = MagicMock()
-
-        mock_http = MagicMock()
-        mock_http.post.return_value = mock_response
-        mock_http.__enter__ = MagicMock(return_value=mock_http)
-        mock_http.__exit__ = MagicMock(return_value=False)
-        mock_client_cls.return_value = mock_http
-
-        token = client.force_refresh()
-        assert token == "forced_token"
-        mock_http.post.assert_called_once()
-
-    @patch("ebay_oauth.auth.httpx.Client")
-    def test_no_access_token_in_response(self, mock_client_cls, client):
-        mock_response = MagicMock()
-        mock_response.json.return_value = {"error": "invalid_grant"}
-        mock_response.raise_for_status = MagicMock()
-
-        mock_http = MagicMock()
-        mock_http.post.return_value = mock_response
-        mock_http.__enter__ = MagicMock(return_value=mock_http)
-        mock_http.__exit__ = MagicMock(return_value=False)
-        mock_client_cls.return_value = mock_http
+        assert client.force_refresh() == "new_access_token"
+        assert len(token_requests) == 1
 
+    def test_no_access_token_in_response(self):
+        client = EbayOAuthClient(
+            client_id="id",
+            client_secret="secret",
+            refresh_token="token",
+            transport=_token_transport({"error": "invalid_grant"}, []),
+        )
         with pytest.raises(RuntimeError, match="No access_token"):
             client.get_access_token()
 
+    def test_http_error_raises(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(401, json={"error": "invalid_client"}))
+        client = EbayOAuthClient(
+            client_id="id",
+            client_secret="secret",
+            refresh_token="token",
+            transport=transport,
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            client.get_access_token()
+
+    def test_http_client_reused_across_refreshes(self, client, token_requests):
+        with client:
+            client.force_refresh()
+            http = client._http
+            client.force_refresh()
+            assert client._http is http
+
+        assert len(token_requests) == 2
+        assert http.is_closed
+        assert client._http is None
+
+    def test_concurrent_callers_share_one_refresh(self, token_requests):
+        import threading
+
+        client = EbayOAuthClient(
+            client_id="id",
+            client_secret="secret",
+            refresh_token="token",
+            transport=_token_transport(
+                {"access_token": "shared_token", "expires_in": 7200},
+                token_requests,
+                delay=0.05,
+            ),
+        )
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.get_access_token()))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == ["shared_token"] * 8
+        assert len(token_requests) == 1
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_persist_uses_keychain_token(self, mock_keyring, mock_transport, token_requests):
+        mock_keyring.get_password.return_value = json.dumps({
+            "refresh_token": "test_refresh_token",
+            "access_token": "persisted_token",
+            "token_expiry": time.time() + 3600,
+        })
+
+        client = EbayOAuthClient(
+            client_id="id",
+            client_secret="secret",
+            refresh_token="test_refresh_token",
+            persist=True,
+            transport=mock_transport,
+        )
+        assert client.get_access_token() == "persisted_token"
+        assert token_requests == []
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_persist_writes_refreshed_token(self, mock_keyring, mock_transport):
+        mock_keyring.get_password.return_value = json.dumps({
+            "refresh_token": "test_refresh_token",
+        })
+
+        client = EbayOAuthClient(
+            client_id="id",
+            client_secret="secret",
+            refresh_token="test_refresh_token",
+            persist=True,
+            transport=mock_transport,
+        )
+        assert client.get_access_token() == "new_access_token"
+
+        stored = json.loads(mock_keyring.set_password.call_args.args[2])
+        assert stored["refresh_token"] == "test_refresh_token"
+        assert stored["access_token"] == "new_access_token"
+        assert stored["token_expiry"] == pytest.approx(time.time() + 7200, abs=5)
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_persist_skips_write_after_setup_rerun(self, mock_keyring, mock_transport):
+        mock_keyring.get_password.return_value = json.dumps({
+            "refresh_token": "test_refresh_token",
+            "environment": "sandbox",
+        })
+
+        client = EbayOAuthClient(
+            client_id="id",
+            client_secret="secret",
+            refresh_token="test_refresh_token",
+            persist=True,
+            transport=mock_transport,
+        )
+
+        # `ebay-oauth setup` stores a new refresh token while the client is alive
+        mock_keyring.get_password.return_value = json.dumps({
+            "refresh_token": "R2",
+            "environment": "production",
+        })
+
+        assert client.get_access_token() == "new_access_token"
+        mock_keyring.set_password.assert_not_called()
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_persist_sees_tokens_from_other_processes(self, mock_keyring, mock_transport):
+        def persisted(access_token):
+            return json.dumps({
+                "refresh_token": "test_refresh_token",
+                "access_token": access_token,
+                "token_expiry": time.time() + 3600,
+            })
+
+        def make_client():
+            return EbayOAuthClient(
+                client_id="id",
+                client_secret="secret",
+                refresh_token="test_refresh_token",
+                persist=True,
+                transport=mock_transport,
+            )
+
+        mock_keyring.get_password.return_value = persisted("first_token")
+        assert make_client().get_access_token() == "first_token"
+
+        # A sibling process writes a newer token to the keychain
+        mock_keyring.get_password.return_value = persisted("second_token")
+        assert make_client().get_access_token() == "second_token"
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_persist_ignores_other_refresh_token(self, mock_keyring):
+        mock_keyring.get_password.return_value = json.dumps({
+            "refresh_token": "someone_else",
+            "access_token": "not_ours",
+            "token_expiry": time.time() + 3600,
+        })
+
+        client = EbayOAuthClient(
+            client_id="id",
+            client_secret="secret",
+            refresh_token="test_refresh_token",
+            persist=True,
+        )
+        assert client._access_token is None
+        assert client._persist is False
+
+
+class TestAsyncEbayOAuthClient:
+    def test_concurrent_callers_share_one_refresh(self, token_requests):
+        import asyncio
+        from ebay_oauth.async_auth import AsyncEbayOAuthClient
+
+        async def handler(request):
+            token_requests.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"access_token": "async_token", "expires_in": 7200})
+
+        async def run():
+            async with AsyncEbayOAuthClient(
+                client_id="id",
+                client_secret="secret",
+                refresh_token="token",
+                transport=httpx.MockTransport(handler),
+            ) as client:
+                tokens = await asyncio.gather(*(client.get_access_token() for _ in range(8)))
+                http = client._http
+            return tokens, http
+
+        tokens, http = asyncio.run(run())
+        assert tokens == ["async_token"] * 8
+        assert len(token_requests) == 1
+        assert http.is_closed
+
+    def test_init_invalid_environment(self):
+        from ebay_oauth.async_auth import AsyncEbayOAuthClient
+
+        with pytest.raises(ValueError, match="Unknown environment"):
+            AsyncEbayOAuthClient(
+                client_id="id",
+                client_secret="secret",
+                refresh_token="token",
+                environment="invalid",
+            )
+
 
 class TestTokenStorage:
     @patch("ebay_oauth.token_storage.keyring")
@@ -167,6 +344,60 @@ class TestTokenStorage:
         mock_keyring.get_password.return_value = None
         assert get_credentials() is None
 
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_update_access_token_merges(self, mock_keyring):
+        from ebay_oauth.token_storage import update_access_token
+
+        mock_keyring.get_password.return_value = '{"refresh_token": "test123"}'
+        assert update_access_token("access123", 1234.5, "test123") is True
+
+        stored = json.loads(mock_keyring.set_password.call_args.args[2])
+        assert stored == {
+            "refresh_token": "test123",
+            "access_token": "access123",
+            "token_expiry": 1234.5,
+        }
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_update_access_token_without_credentials(self, mock_keyring):
+        from ebay_oauth.token_storage import update_access_token
+
+        mock_keyring.get_password.return_value = None
+        assert update_access_token("access123", 1234.5, "test123") is False
+        mock_keyring.set_password.assert_not_called()
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_update_access_token_other_refresh_token(self, mock_keyring):
+        from ebay_oauth.token_storage import update_access_token
+
+        mock_keyring.get_password.return_value = '{"refresh_token": "other"}'
+        assert update_access_token("access123", 1234.5, "test123") is False
+        mock_keyring.set_password.assert_not_called()
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_update_access_token_other_environment(self, mock_keyring):
+        from ebay_oauth.token_storage import update_access_token
+
+        mock_keyring.get_password.return_value = (
+            '{"refresh_token": "test123", "environment": "production"}'
+        )
+        assert update_access_token("access123", 1234.5, "test123", "sandbox") is False
+        mock_keyring.set_password.assert_not_called()
+
+    @patch("ebay_oauth.token_storage.keyring")
+    def test_get_caches_keychain_read(self, mock_keyring):
+        from ebay_oauth.token_storage import store_credentials, get_credentials
+
+        mock_keyring.get_password.return_value = '{"refresh_token": "test123"}'
+        assert get_credentials()["refresh_token"] == "test123"
+        assert get_credentials()["refresh_token"] == "test123"
+        mock_keyring.get_password.assert_called_once()
+
+        store_credentials({"refresh_token": "test456"})
+        mock_keyring.get_password.return_value = '{"refresh_token": "test456"}'
+        assert get_credentials()["refresh_token"] == "test456"
+        assert mock_keyring.get_password.call_count == 2
+
     @patch("ebay_oauth.token_storage.keyring")
     def test_delete(self, mock_keyring):
         from ebay_oauth.token_storage import delete_credentials
@@ -183,10 +414,23 @@ class TestTokenStorage:
 
 
 class TestCallbackServer:
-    def test_find_available_port(self):
-        from ebay_oauth.server import _find_available_port
-        port = _find_available_port()
-        assert 8880 <= port <= 8899
+    def test_bind_available_port(self):
+        from ebay_oauth.server import _bind_available_port
+        server = _bind_available_port()
+        try:
+            assert 8880 <= server.server_address[1] <= 8899
+        finally:
+            server.server_close()
+
+    def test_bind_skips_busy_port(self):
+        from ebay_oauth.server import _bind_available_port
+        first = _bind_available_port()
+        try:
+            second = _bind_available_port()
+            assert second.server_address[1] != first.server_address[1]
+            second.server_close()
+        finally:
+            first.server_close()
 
     def test_generate_nonce(self):
         from ebay_oauth.server import _generate_nonce
@@ -202,3 +446,224 @@ class TestCallbackServer:
         assert len(nonce) > 20
         assert server is not None
         server.server_close()
+
+    def test_wait_for_callback_receives_tokens(self):
+        from ebay_oauth.server import start_callback_server, wait_for_callback
+        port, nonce, server = start_callback_server()
+
+        def send_callback():
+            httpx.get(
+                f"http://127.0.0.1:{port}/callback",
+                params={"nonce": nonce, "refresh_token": "cb_refresh", "access_token": "cb_access"},
+            )
+
+        import threading
+        threading.Timer(0.05, send_callback).start()
+
+        result = wait_for_callback(server, timeout=5)
+        assert result["refresh_token"] == "cb_refresh"
+        assert result["access_token"] == "cb_access"
+
+    def test_wait_for_callback_returns_promptly(self):
+        from ebay_oauth.server import start_callback_server, wait_for_callback
+        port, nonce, server = start_callback_server()
+
+        sent_at = []
+
+        def send_callback():
+            sent_at.append(time.monotonic())
+            httpx.get(
+                f"http://127.0.0.1:{port}/callback",
+                params={"nonce": nonce, "refresh_token": "cb_refresh"},
+            )
+
+        import threading
+        sender = threading.Timer(0.05, send_callback)
+        sender.start()
+
+        wait_for_callback(server, timeout=30)
+        returned_at = time.monotonic()
+        sender.join()
+        assert returned_at - sent_at[0] < 0.5
+
+    def test_callback_repeated_nonce_uses_first_value(self):
+        from ebay_oauth.server import start_callback_server, wait_for_callback
+        port, nonce, server = start_callback_server()
+
+        def send_callback():
+            httpx.get(
+                f"http://127.0.0.1:{port}/callback",
+                params=[("nonce", "wrong"), ("nonce", nonce), ("refresh_token", "cb_refresh")],
+            )
+
+        import threading
+        sender = threading.Timer(0.05, send_callback)
+        sender.start()
+
+        with pytest.raises(RuntimeError, match="Nonce mismatch"):
+            wait_for_callback(server, timeout=5)
+        sender.join()
+
+    def test_callback_nonce_mismatch(self):
+        from ebay_oauth.server import start_callback_server, wait_for_callback
+        port, _, server = start_callback_server()
+
+        responses = []
+
+        def send_callback():
+            responses.append(httpx.get(
+                f"http://127.0.0.1:{port}/callback",
+                params={"nonce": "wrong", "refresh_token": "cb_refresh"},
+            ))
+
+        import threading
+        sender = threading.Timer(0.05, send_callback)
+        sender.start()
+
+        with pytest.raises(RuntimeError, match="Nonce mismatch"):
+            wait_for_callback(server, timeout=5)
+        sender.join()
+        assert responses[0].status_code == 400
+        assert b"nonce mismatch" in responses[0].content
+
+    def test_wait_for_callback_timeout(self):
+        from ebay_oauth.server import start_callback_server, wait_for_callback
+        _, _, server = start_callback_server()
+        with pytest.raises(TimeoutError):
+            wait_for_callback(server, timeout=0.1)
+
+
+@pytest.fixture
+def cli_env(monkeypatch, mock_transport):
+    """Run CLI commands against a mocked keychain and token endpoint."""
+    from unittest.mock import MagicMock
+
+    real_client = httpx.Client
+    monkeypatch.setattr(
+        "ebay_oauth.auth.httpx.Client",
+        lambda **kwargs: real_client(**{**kwargs, "transport": mock_transport}),
+    )
+    monkeypatch.delenv("EBAY_CLIENT_ID", raising=False)
+    monkeypatch.setenv("EBAY_CLIENT_SECRET", "secret")
+
+    mock_keyring = MagicMock()
+    monkeypatch.setattr("ebay_oauth.token_storage.keyring", mock_keyring)
+    return mock_keyring
+
+
+def _stored(refresh_token="test_refresh_token", **extra):
+    return json.dumps({
+        "refresh_token": refresh_token,
+        "environment": "sandbox",
+        "client_id": "id",
+        **extra,
+    })
+
+
+def _invoke(*args):
+    from click.testing import CliRunner
+    from ebay_oauth.cli import cli
+
+    return CliRunner().invoke(cli, list(args))
+
+
+class TestCli:
+    def test_status_reads_keychain_once(self, cli_env):
+        cli_env.get_password.return_value = _stored(
+            access_token="persisted_token", token_expiry=time.time() + 3600,
+        )
+
+        result = _invoke("status")
+        assert result.exit_code == 0
+        assert cli_env.get_password.call_count == 1
+
+    def test_status_refresh_rereads_keychain_only_to_write(self, cli_env):
+        cli_env.get_password.return_value = _stored()
+
+        result = _invoke("status")
+        assert result.exit_code == 0
+        # One read for the command, one fresh read before merging the new token
+        assert cli_env.get_password.call_count == 2
+
+    def test_status_with_valid_persisted_token(self, cli_env, token_requests):
+        cli_env.get_password.return_value = _stored(
+            access_token="persisted_token", token_expiry=time.time() + 3600,
+        )
+
+        result = _invoke("status")
+        assert result.exit_code == 0
+        assert "Access token: valid" in result.output
+        assert token_requests == []
+        cli_env.set_password.assert_not_called()
+
+    def test_status_with_expired_token(self, cli_env, token_requests):
+        cli_env.get_password.return_value = _stored(
+            access_token="old_token", token_expiry=time.time() - 100,
+        )
+
+        result = _invoke("status")
+        assert result.exit_code == 0
+        assert "Access token: valid" in result.output
+        assert len(token_requests) == 1
+        cli_env.set_password.assert_called_once()
+        stored = json.loads(cli_env.set_password.call_args.args[2])
+        assert stored["access_token"] == "new_access_token"
+        assert stored["refresh_token"] == "test_refresh_token"
+
+    def test_status_skips_write_when_refresh_token_changes(self, cli_env, token_requests):
+        # `ebay-oauth setup` stores a new refresh token after status has read the old one
+        cli_env.get_password.side_effect = [_stored(), _stored(refresh_token="R2")]
+
+        result = _invoke("status")
+        assert result.exit_code == 0
+        assert "Access token: valid" in result.output
+        assert len(token_requests) == 1
+        cli_env.set_password.assert_not_called()
+
+
+class TestSetup:
+    @patch("ebay_oauth.cli.webbrowser.open")
+    @patch("ebay_oauth.cli._exchange_code_for_tokens")
+    def test_repeated_code_uses_first_value(self, mock_exchange, _mock_open, cli_env, monkeypatch):
+        monkeypatch.setenv("EBAY_CLIENT_ID", "id")
+        mock_exchange.return_value = {"refresh_token": "r", "access_token": "a"}
+
+        from click.testing import CliRunner
+        from ebay_oauth.cli import cli
+
+        result = CliRunner().invoke(
+            cli, ["setup"], input="https://example.com/success?code=first&code=second\n",
+        )
+        assert result.exit_code == 0, result.output
+        assert mock_exchange.call_args.args[0] == "first"
+
+
+class TestPackageImports:
+    def test_cli_import_skips_heavy_modules(self):
+        import os
+        import subprocess
+        import sys
+        import ebay_oauth
+
+        src_dir = os.path.dirname(os.path.dirname(ebay_oauth.__file__))
+        pythonpath = os.pathsep.join(filter(None, [src_dir, os.environ.get("PYTHONPATH")]))
+        env = {**os.environ, "PYTHONPATH": pythonpath}
+        code = (
+            "import sys, ebay_oauth.cli; "
+            "print(','.join(m for m in ('httpx', 'keyring', 'ebay_oauth.auth') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == ""
+
+    def test_lazy_client_exports(self):
+        import ebay_oauth
+        from ebay_oauth.async_auth import AsyncEbayOAuthClient
+
+        assert ebay_oauth.EbayOAuthClient is EbayOAuthClient
+        assert ebay_oauth.AsyncEbayOAuthClient is AsyncEbayOAuthClient
+        assert "EbayOAuthClient" in vars(ebay_oauth)
+        assert {"EbayOAuthClient", "AsyncEbayOAuthClient"} <= set(dir(ebay_oauth))
+        with pytest.raises(AttributeError):
+            ebay_oauth.NotAThing